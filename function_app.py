@@ -2,196 +2,599 @@ import os
 import azure.functions as func
 import logging
 import pyodbc
-import json
+import orjson
 from azure.identity import ClientSecretCredential
-from dotenv import load_dotenv
 from functools import wraps
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
 import threading
 import asyncio
+import time
+import queue
+import struct
+import gzip
+import hashlib
+import random
 
-# Load environment variables
-load_dotenv()
+# Check if running in Azure
+IS_AZURE = os.getenv('WEBSITE_INSTANCE_ID') is not None
+
+# Load environment variables from .env for local development; Azure injects them directly
+if not IS_AZURE:
+    from dotenv import load_dotenv
+    load_dotenv()
 
 # Azure AD credentials
-client_id = os.getenv('AZURE_CLIENT_ID')
-client_secret = os.getenv('AZURE_CLIENT_SECRET')
-tenant_id = os.getenv('AZURE_TENANT_ID')
+CLIENT_ID = os.getenv('AZURE_CLIENT_ID')
+CLIENT_SECRET = os.getenv('AZURE_CLIENT_SECRET')
+TENANT_ID = os.getenv('AZURE_TENANT_ID')
 
 # SQL Server details
-server = os.getenv('SQL_SERVER')
-database = os.getenv('SQL_DATABASE')
-port = os.getenv('SQL_PORT')
+SQL_SERVER = os.getenv('SQL_SERVER')
+SQL_DATABASE = os.getenv('SQL_DATABASE')
+SQL_PORT = os.getenv('SQL_PORT')
+
+# Connection pool, kept for the life of the worker process. Pooled connections run in
+# autocommit mode; wrap any future multi-statement write in an explicit transaction.
+pyodbc.pooling = True  # must be set before the first connect
+_POOL_SIZE = int(os.getenv('SQL_POOL_SIZE', '5'))
+_connection_pool = queue.LifoQueue(maxsize=_POOL_SIZE)
+_FETCH_BATCH_SIZE = 1000  # rows per fetchmany() round trip
+_QUERY_TIMEOUT_SECONDS = 30
+
+# Connection string is fixed for the life of the process; auth comes from the cached token
+_CONN_STR = (
+    f"Driver={{ODBC Driver 18 for SQL Server}};"
+    f"Server=tcp:{SQL_SERVER},{SQL_PORT};"
+    f"Database={SQL_DATABASE};"
+    "Encrypt=yes;"
+    "TrustServerCertificate=no;"
+    "Connection Timeout=30;"
+)
+SQL_COPT_SS_ACCESS_TOKEN = 1256
 
-# Check if running in Azure
-is_azure = os.getenv('WEBSITE_INSTANCE_ID') is not None
+def get_db_connection():
+    """Open a new database connection authenticated with the cached AAD token"""
+    # Autocommit: every write here is a single statement, so skip the COMMIT round trip
+    conn = pyodbc.connect(
+        _CONN_STR,
+        autocommit=True,
+        attrs_before={SQL_COPT_SS_ACCESS_TOKEN: get_access_token_struct()}
+    )
+    conn.timeout = _QUERY_TIMEOUT_SECONDS
+    return conn
 
-# Connection pool
-_connection_pool = {}
-_connection_pool_lock = threading.Lock()
+def _close_quietly(conn):
+    """Close a connection, ignoring errors from an already-broken link"""
+    try:
+        conn.close()
+    except pyodbc.Error:
+        pass
 
-def get_db_connection():
-    """Get a database connection from the pool or create a new one"""
-    thread_id = threading.get_ident()
+def _release_conn(conn):
+    """Return a connection to the pool, closing it if the pool is full"""
+    try:
+        _connection_pool.put_nowait(conn)
+    except queue.Full:
+        _close_quietly(conn)
+
+@contextmanager
+def transaction(conn):
+    """Run a with-block as one transaction on a pooled autocommit connection"""
+    conn.autocommit = False
+    try:
+        yield
+        conn.commit()
+    except BaseException:
+        # Roll back before autocommit is restored, which would otherwise commit
+        try:
+            conn.rollback()
+        except pyodbc.Error:
+            pass
+        raise
+    finally:
+        try:
+            conn.autocommit = True
+        except pyodbc.Error:
+            pass
+
+_QUERY_TIMEOUT_SQLSTATE = 'HYT00'
+
+def is_disconnect_error(e):
+    """Whether an error means the connection itself is gone rather than the statement failing"""
+    # A query timeout is an OperationalError too, but the connection is still usable
+    if isinstance(e, pyodbc.OperationalError):
+        return not (e.args and e.args[0] == _QUERY_TIMEOUT_SQLSTATE)
+    return isinstance(e, pyodbc.InterfaceError)
+
+@contextmanager
+def borrow_conn():
+    """Borrow a pooled database connection for the duration of a with-block"""
+    # No liveness probe: a dead connection fails its real query and read paths reconnect
+    try:
+        conn = _connection_pool.get_nowait()
+    except queue.Empty:
+        conn = get_db_connection()
     
-    with _connection_pool_lock:
-        if thread_id in _connection_pool:
+    try:
+        yield conn
+    except BaseException as e:
+        if is_disconnect_error(e):
+            # Connection may be broken, don't hand it to the next caller
+            _close_quietly(conn)
+            raise
+        try:
+            conn.rollback()
+        except pyodbc.Error:
+            # Couldn't reset it, so close it rather than pool it; the original error still propagates
+            _close_quietly(conn)
+        else:
+            _release_conn(conn)
+        raise
+    _release_conn(conn)
+
+@contextmanager
+def borrow_cursor():
+    """Borrow a pooled connection and a cursor on it, closing the cursor before the connection goes back"""
+    with borrow_conn() as conn:
+        cursor = conn.cursor()
+        try:
+            yield cursor
+        finally:
+            # An open cursor with unread results would leave the pooled connection busy
             try:
-                # Test if connection is still alive
-                _connection_pool[thread_id].cursor().execute("SELECT 1")
-                return _connection_pool[thread_id]
-            except:
-                # Connection is dead, remove it
-                del _connection_pool[thread_id]
-        
-        # Create new connection
-        token = get_access_token()
-        connection_string = (
-            f"Driver={{ODBC Driver 18 for SQL Server}};"
-            f"Server=tcp:{server},{port};"
-            f"Database={database};"
-            "Encrypt=yes;"
-            "TrustServerCertificate=no;"
-            "Connection Timeout=30;"
-            "Authentication=ActiveDirectoryServicePrincipal;"
-            f"UID={client_id}@{tenant_id};"
-            f"PWD={client_secret};"
-        )
-        
-        conn = pyodbc.connect(connection_string)
-        _connection_pool[thread_id] = conn
-        return conn
+                cursor.close()
+            except pyodbc.Error:
+                pass
+
+def _discard_pool():
+    """Close every idle pooled connection, e.g. after the server dropped them"""
+    while True:
+        try:
+            conn = _connection_pool.get_nowait()
+        except queue.Empty:
+            return
+        _close_quietly(conn)
+
+def _call_with_reconnect(fn, args, retry):
+    """Call a database function, retrying once on a fresh connection if retry and the link dropped"""
+    try:
+        return fn(*args)
+    except pyodbc.Error as e:
+        if not is_disconnect_error(e):
+            raise
+        # Idle pooled connections likely went down with this one
+        _discard_pool()
+        if not retry:
+            raise
+        logging.warning("Database connection lost, reconnecting: %s", e)
+        return fn(*args)
+
+# Blocking pyodbc work runs here so it doesn't stall the worker's event loop
+_db_executor = ThreadPoolExecutor(max_workers=_POOL_SIZE, thread_name_prefix="db")
+
+async def run_db(fn, *args, retry=False):
+    """Run a blocking database function on the DB thread pool"""
+    # Only reads may set retry: a write whose link dropped may already have committed
+    return await asyncio.get_running_loop().run_in_executor(
+        _db_executor, _call_with_reconnect, fn, args, retry
+    )
 
 def require_auth(f):
     """Decorator to handle authentication"""
+    # Local runs have no EasyAuth headers to check, so leave the handler unwrapped
+    if not IS_AZURE:
+        return f
+    
+    is_async = asyncio.iscoroutinefunction(f)
+    
     @wraps(f)
     async def decorated_function(req: func.HttpRequest, *args, **kwargs):
         is_authenticated, error_message = check_authentication(req)
         if not is_authenticated:
-            return func.HttpResponse(error_message, status_code=401)
-        return await f(req, *args, **kwargs) if asyncio.iscoroutinefunction(f) else f(req, *args, **kwargs)
+            response = _UNAUTHORIZED_RESPONSES.get(error_message)
+            if response is None:
+                response = func.HttpResponse(error_message, status_code=401)
+            return response
+        return await f(req, *args, **kwargs) if is_async else f(req, *args, **kwargs)
     return decorated_function
 
-def format_response(data, status_code=200):
-    """Helper function to format consistent responses"""
+def json_response(body, status_code=200, headers=None):
+    """Wrap an already-encoded JSON body in a response"""
     return func.HttpResponse(
-        json.dumps(data, default=str),
+        body,
         mimetype="application/json",
-        status_code=status_code
+        status_code=status_code,
+        headers={**(headers or {}), "Content-Length": str(len(body))}
     )
 
+def make_etag(body):
+    """Build a strong ETag from a response body's content"""
+    return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+def conditional_json_response(req: func.HttpRequest, body, etag, cache_control="no-cache"):
+    """Return 304 if the client already holds this body, else the body tagged with its ETag"""
+    # The ETag is computed when the body is cached, so a cache hit does no hashing
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if etag in req.headers.get('If-None-Match', ''):
+        return func.HttpResponse(status_code=304, headers=headers)
+    return json_response(body, headers=headers)
+
+def format_response(data, status_code=200):
+    """Helper function to format consistent responses"""
+    return json_response(orjson.dumps(data, default=str), status_code)
+
+def error_response(error, status_code=500):
+    """Build an {"error": ...} response by splicing the encoded message into a fixed template"""
+    return json_response(b'{"error":' + orjson.dumps(str(error)) + b'}', status_code)
+
+def not_found_response(station_id):
+    """Build the 404 for a station ID that matched no row"""
+    return error_response(f"Station {station_id} not found", 404)
+
+# IDs are bound as SQL INT, so anything outside its range can't match and would fail in the driver
+_MIN_STATION_ID = -2**31
+_MAX_STATION_ID = 2**31 - 1
+
+def is_station_id(value) -> bool:
+    """Whether a value is an int that fits the INT ID column"""
+    return type(value) is int and _MIN_STATION_ID <= value <= _MAX_STATION_ID
+
+def parse_station_id(req: func.HttpRequest) -> int:
+    """Read the station ID route parameter as an int"""
+    raw_id = req.route_params.get('id')
+    try:
+        station_id = int(raw_id)
+    except (TypeError, ValueError):
+        station_id = None
+    if not is_station_id(station_id):
+        raise ValueError(f"Invalid station ID: {raw_id}")
+    return station_id
+
+# Bind the ID parameter as INT so it matches the key column and reuses one plan
+_ID_INPUT_SIZES = [(pyodbc.SQL_INTEGER, 0, 0)]
+
 # Cache for schema
+_SCHEMA_REFRESH_SECONDS = 540  # background refresh interval, plus jitter
+_SCHEMA_REFRESH_JITTER_SECONDS = 60
+_SCHEMA_TTL_SECONDS = 900  # fallback expiry if background refreshes keep failing
+_SCHEMA_CACHE_CONTROL = "private, max-age=600"  # schema changes are rare; the ETag covers reloads after expiry
 _schema_cache = None
+_schema_response = None  # (serialized {"columns": ...} body, its ETag), swapped as one
+_schema_col_order = {}  # column name -> ordinal position
+_station_columns = ()  # all column names in table order, as returned by OUTPUT INSERTED.*
+_allowed_columns = frozenset()  # columns a client may write
+_clone_sql = None  # INSERT ... SELECT copying every writable column
+_clone_id_sql = None  # same copy, outputting only the new ID
+_clone_many_prefix = None  # same full copy for many IDs, completed with an IN (...) list
+_clone_many_sql_cache = {}  # padded ID count -> completed statement, reset with the schema
+_list_columns = ()  # columns the station list returns: everything except secrets
+_list_sql = None  # SELECT of _list_columns for GET /api/stations
+_station_sql = None  # SELECT of every column for one station by ID
+_schema_cache_time = 0.0
 _schema_cache_lock = threading.Lock()
 
+# Schema entry keys, in the order of the columns selected from sys.columns
+_SCHEMA_KEYS = ('name', 'type', 'max_length', 'is_nullable', 'is_identity', 'input_type')
+
+def is_secret_column(name):
+    """Columns the station list leaves out; the edit form fetches them per station"""
+    return 'ConnectionString' in name or name == 'TempestToken'
+
+def _load_schema():
+    """Query the table definition and rebuild everything derived from it; caller holds the lock"""
+    global _schema_cache, _schema_response, _schema_col_order, _station_columns, _allowed_columns, _clone_sql, _clone_id_sql, _clone_many_prefix, _clone_many_sql_cache, _list_columns, _list_sql, _station_sql, _schema_cache_time
+    
+    try:
+        with borrow_cursor() as cursor:
+        
+            # First verify the table exists
+            cursor.execute("""
+                SELECT COUNT(*) 
+                FROM sys.tables 
+                WHERE name = 'StationTracking'
+            """)
+            if cursor.fetchone()[0] == 0:
+                raise Exception("Table 'StationTracking' does not exist")
+        
+            cursor.execute("""
+                SELECT 
+                    c.name as COLUMN_NAME,
+                    t.name as DATA_TYPE,
+                    c.max_length as CHARACTER_MAXIMUM_LENGTH,
+                    c.is_nullable as IS_NULLABLE,
+                    c.is_identity as IS_IDENTITY,
+                    CASE 
+                        WHEN t.name = 'bit' THEN 'bit'
+                        WHEN t.name IN ('int', 'bigint', 'smallint', 'tinyint') THEN 'number'
+                        ELSE 'text'
+                    END as INPUT_TYPE
+                FROM sys.columns c
+                JOIN sys.types t ON c.user_type_id = t.user_type_id
+                WHERE c.object_id = OBJECT_ID('StationTracking')
+                ORDER BY c.column_id
+            """)
+        
+            # is_nullable and is_identity are bit columns, so they arrive as bools
+            columns = [dict(zip(_SCHEMA_KEYS, row)) for row in cursor.fetchall()]
+        
+        schema_json = orjson.dumps({"columns": columns}, default=str)
+        _schema_response = (schema_json, make_etag(schema_json))
+        _schema_col_order = {column['name']: i for i, column in enumerate(columns)}
+        _station_columns = tuple(column['name'] for column in columns)
+        writable = [
+            column['name'] for column in columns
+            if column['name'] != 'ID' and not column['is_identity']
+        ]
+        _allowed_columns = frozenset(writable)
+        writable_list = ', '.join(writable)
+        output_list = ', '.join(f"INSERTED.{name}" for name in _station_columns)
+        _clone_sql = (
+            f"INSERT INTO StationTracking ({writable_list}) OUTPUT {output_list} "
+            f"SELECT {writable_list} FROM StationTracking WHERE ID = ?"
+        )
+        _clone_id_sql = (
+            f"INSERT INTO StationTracking ({writable_list}) OUTPUT INSERTED.ID "
+            f"SELECT {writable_list} FROM StationTracking WHERE ID = ?"
+        )
+        _clone_many_prefix = (
+            f"INSERT INTO StationTracking ({writable_list}) OUTPUT {output_list} "
+            f"SELECT {writable_list} FROM StationTracking WHERE ID IN "
+        )
+        _clone_many_sql_cache = {}
+        _list_columns = tuple(name for name in _station_columns if not is_secret_column(name))
+        _list_sql = f"SELECT {', '.join(_list_columns)} FROM StationTracking"
+        _station_sql = f"SELECT {', '.join(_station_columns)} FROM StationTracking WHERE ID = ?"
+        # Publish the schema last so lock-free readers never pair it with stale derived state
+        _schema_cache = columns
+        _schema_cache_time = time.monotonic()
+        logging.info("Successfully retrieved schema with %d columns", len(columns))
+    except Exception as e:
+        logging.error("Error loading schema: %s", e)
+        raise
+
 def get_cached_schema():
     """Get schema from cache or fetch from database"""
-    global _schema_cache
+    # Lock-free fast path; the background refresher normally keeps this warm
+    schema = _schema_cache
+    if schema is not None and time.monotonic() - _schema_cache_time <= _SCHEMA_TTL_SECONDS:
+        return schema
     
     with _schema_cache_lock:
-        if _schema_cache is None:
-            try:
-                conn = get_db_connection()
-                cursor = conn.cursor()
-                
-                # First verify the table exists
-                cursor.execute("""
-                    SELECT COUNT(*) 
-                    FROM sys.tables 
-                    WHERE name = 'StationTracking'
-                """)
-                if cursor.fetchone()[0] == 0:
-                    raise Exception("Table 'StationTracking' does not exist")
-                
-                cursor.execute("""
-                    SELECT 
-                        c.name as COLUMN_NAME,
-                        t.name as DATA_TYPE,
-                        c.max_length as CHARACTER_MAXIMUM_LENGTH,
-                        CASE WHEN c.is_nullable = 1 THEN 'YES' ELSE 'NO' END as IS_NULLABLE,
-                        CASE WHEN c.is_identity = 1 THEN 1 ELSE 0 END as IS_IDENTITY,
-                        CASE 
-                            WHEN t.name = 'bit' THEN 'bit'
-                            WHEN t.name IN ('int', 'bigint', 'smallint', 'tinyint') THEN 'number'
-                            ELSE 'text'
-                        END as INPUT_TYPE
-                    FROM sys.columns c
-                    JOIN sys.types t ON c.user_type_id = t.user_type_id
-                    WHERE c.object_id = OBJECT_ID('StationTracking')
-                    ORDER BY c.column_id
-                """)
-                
-                columns = []
-                for row in cursor.fetchall():
-                    column = {
-                        'name': row[0],
-                        'type': row[1],
-                        'max_length': row[2],
-                        'is_nullable': row[3] == 'YES',
-                        'is_identity': bool(row[4]),
-                        'input_type': row[5]
-                    }
-                    columns.append(column)
-                
-                _schema_cache = columns
-                logging.info(f"Successfully retrieved schema with {len(columns)} columns")
-            except Exception as e:
-                logging.error(f"Error in get_cached_schema: {str(e)}")
-                raise
-        
+        if _schema_cache is None or time.monotonic() - _schema_cache_time > _SCHEMA_TTL_SECONDS:
+            _load_schema()
         return _schema_cache
 
+def _refresh_schema_loop():
+    """Reload the schema periodically, with jitter so instances don't refresh in lockstep"""
+    while True:
+        try:
+            with _schema_cache_lock:
+                _load_schema()
+        except Exception as e:
+            logging.warning("Background schema refresh failed: %s", e)
+        time.sleep(_SCHEMA_REFRESH_SECONDS + random.uniform(0, _SCHEMA_REFRESH_JITTER_SECONDS))
+
+def peek_cached_schema_response():
+    """Get the pre-serialized schema and its ETag if cached and fresh, without touching the database"""
+    if _schema_cache is not None and time.monotonic() - _schema_cache_time <= _SCHEMA_TTL_SECONDS:
+        return _schema_response
+    return None
+
+def get_cached_schema_response():
+    """Get the schema as a pre-serialized JSON response body and its ETag"""
+    get_cached_schema()
+    return _schema_response
+
+def invalidate_schema_cache():
+    """Force the next schema lookup to re-read the table definition"""
+    global _schema_cache
+    with _schema_cache_lock:
+        _schema_cache = None
+
+_SCHEMA_DRIFT_SQLSTATES = ('42S22', '42S02')  # invalid column name, invalid object name
+
+def execute_schema_sql(cursor, sql, *params):
+    """Execute SQL that names cached columns, invalidating the schema if one no longer exists"""
+    try:
+        cursor.execute(sql, *params)
+    except pyodbc.ProgrammingError as e:
+        # Only a missing column or table means the cached schema is stale; permission
+        # and other syntax-class errors would otherwise force a reload on every request
+        if e.args and e.args[0] in _SCHEMA_DRIFT_SQLSTATES:
+            invalidate_schema_cache()
+        raise
+
+def row_to_dict(cursor, row, columns):
+    """Map a row onto cached column names, falling back to cursor.description on drift"""
+    if len(row) != len(columns):
+        # Table changed since the schema was cached
+        logging.warning("StationTracking columns changed, refreshing cached schema")
+        invalidate_schema_cache()
+        columns = [column[0] for column in cursor.description]
+    return dict(zip(columns, row))
+
+# Parameterized SQL keyed by column tuple, so each shape of write has one SQL text
+_insert_sql_cache = {}  # keyed by (columns, rows); bulk inserts only use a few fixed row counts
+_update_sql_cache = {}
+
+def writable_values(req_body):
+    """Keep only request keys that are writable StationTracking columns"""
+    get_cached_schema()
+    allowed = _allowed_columns
+    values = {k: v for k, v in req_body.items() if k in allowed}
+    if not values:
+        raise ValueError("Request body contains no valid station columns")
+    return values
+
+def get_station_columns():
+    """Get all StationTracking column names in table order"""
+    get_cached_schema()
+    return _station_columns
+
+def get_station_sql():
+    """Get the single-station query and the column names it returns"""
+    get_cached_schema()
+    return _station_sql, _station_columns
+
+def get_clone_sql(full=True):
+    """Get the clone statement and the column names of the row it outputs"""
+    get_cached_schema()
+    if full:
+        return _clone_sql, _station_columns
+    return _clone_id_sql, ('ID',)
+
+def get_list_sql():
+    """Get the station list query and the column names it returns"""
+    get_cached_schema()
+    return _list_sql, _list_columns
+
+def get_clone_many_sql(count):
+    """Get the clone statement for a batch of count IDs and the column names it outputs"""
+    get_cached_schema()
+    cache = _clone_many_sql_cache
+    sql = cache.get(count)
+    if sql is None:
+        sql = _clone_many_prefix + "(" + ", ".join(["?"] * count) + ")"
+        cache[count] = sql
+    return sql, _station_columns
+
+def ordered_columns(names):
+    """Order column names by table position so equal key sets map to the same SQL"""
+    get_cached_schema()
+    order = _schema_col_order
+    return tuple(sorted(names, key=lambda name: (order.get(name, len(order)), name)))
+
+def get_insert_sql(columns, rows=1):
+    """Get the INSERT ... OUTPUT statement for an ordered column tuple and row count"""
+    key = (columns, rows)
+    sql = _insert_sql_cache.get(key)
+    if sql is None:
+        placeholders = ', '.join([f"({', '.join(['?' for _ in columns])})"] * rows)
+        sql = f"INSERT INTO StationTracking ({', '.join(columns)}) OUTPUT INSERTED.* VALUES {placeholders}"
+        _insert_sql_cache[key] = sql
+    return sql
+
+def get_update_sql(columns):
+    """Get the UPDATE ... OUTPUT statement for an ordered column tuple"""
+    sql = _update_sql_cache.get(columns)
+    if sql is None:
+        set_clause = ', '.join([f"{k} = ?" for k in columns])
+        sql = f"UPDATE StationTracking SET {set_clause} OUTPUT INSERTED.* WHERE ID = ?"
+        _update_sql_cache[columns] = sql
+    return sql
+
+# Serialized read results keyed by SQL text, dropped on every write from this instance
+_RESULT_CACHE_TTL_SECONDS = 15  # bounds staleness from writes made on other instances
+_result_cache = {}  # sql -> (fetched_at, (body, etag))
+_result_cache_generation = 0  # bumped on invalidation so in-flight reads don't store stale bodies
+
+def get_cached_result(sql):
+    """Get a cached (body, ETag) for a query, or None if missing or expired"""
+    entry = _result_cache.get(sql)
+    if entry is not None and time.monotonic() - entry[0] < _RESULT_CACHE_TTL_SECONDS:
+        return entry[1]
+    return None
+
+def store_cached_result(sql, body, generation):
+    """Tag a response body, caching it unless a write invalidated the cache while it was read"""
+    result = (body, make_etag(body))
+    if generation == _result_cache_generation:
+        _result_cache[sql] = (time.monotonic(), result)
+    return result
+
+def invalidate_result_cache():
+    """Drop all cached query results after a write"""
+    global _result_cache_generation
+    _result_cache_generation += 1
+    _result_cache.clear()
+
+# Pre-built 401 messages so the rejection path doesn't format strings per request
+_LOGIN_REQUIRED_MSG = "Unauthorized - Please log in to access this application"
+_WRONG_TENANT_MSG = f"Unauthorized - Only users from tenant {TENANT_ID} are allowed to access this application"
+
+_AUTH_OK = (True, "")
+_AUTH_LOGIN_REQUIRED = (False, _LOGIN_REQUIRED_MSG)
+_AUTH_WRONG_TENANT = (False, _WRONG_TENANT_MSG)
+
+# Rejections are constant, so their responses are built once and reused
+_UNAUTHORIZED_RESPONSES = {
+    _LOGIN_REQUIRED_MSG: func.HttpResponse(_LOGIN_REQUIRED_MSG, status_code=401),
+    _WRONG_TENANT_MSG: func.HttpResponse(_WRONG_TENANT_MSG, status_code=401),
+}
+
 def check_authentication(req: func.HttpRequest) -> tuple[bool, str]:
     """Check if the request is authenticated and from the correct tenant"""
-    # Skip authentication for UI endpoint
-    if req.route_params.get('route') == 'ui':
-        return True, ""
-    
-    if not is_azure:
-        return True, ""
+    # Only reached in Azure; require_auth skips the check locally and serve_ui isn't wrapped
     
     # Get the client principal from the request headers
-    client_principal_id = req.headers.get('X-MS-CLIENT-PRINCIPAL-ID')
-    client_principal_name = req.headers.get('X-MS-CLIENT-PRINCIPAL-NAME')
-    client_principal_tenant_id = req.headers.get('X-MS-CLIENT-PRINCIPAL-TENANT-ID')
+    header = req.headers.get
+    if not header('X-MS-CLIENT-PRINCIPAL-ID'):
+        return _AUTH_LOGIN_REQUIRED
     
-    if not client_principal_id:
-        return False, "Unauthorized - Please log in to access this application"
+    if header('X-MS-CLIENT-PRINCIPAL-TENANT-ID') != TENANT_ID:
+        return _AUTH_WRONG_TENANT
     
-    if client_principal_tenant_id != tenant_id:
-        return False, f"Unauthorized - Only users from tenant {tenant_id} are allowed to access this application"
+    return _AUTH_OK
+
+# Credential and token cache, shared across invocations
+_credential = None
+_token_cache = None  # (expires_on, odbc_token_struct)
+_token_lock = threading.Lock()
+_TOKEN_REFRESH_MARGIN = 300  # seconds before expiry to refresh
+
+def get_access_token_struct():
+    """Get the access token packed for the SQL_COPT_SS_ACCESS_TOKEN connection attribute"""
+    global _credential, _token_cache
     
-    return True, ""
-
-def get_access_token():
-    """Get access token using service principal credentials"""
-    credential = ClientSecretCredential(
-        tenant_id=tenant_id,
-        client_id=client_id,
-        client_secret=client_secret
-    )
+    cached = _token_cache
+    if cached is not None and time.time() < cached[0] - _TOKEN_REFRESH_MARGIN:
+        return cached[1]
     
-    # Get token for SQL Server resource
-    access_token = credential.get_token("https://database.windows.net/.default")
-    return access_token.token
+    with _token_lock:
+        # Another thread may have refreshed while we waited
+        cached = _token_cache
+        if cached is not None and time.time() < cached[0] - _TOKEN_REFRESH_MARGIN:
+            return cached[1]
+        
+        if _credential is None:
+            _credential = ClientSecretCredential(
+                tenant_id=TENANT_ID,
+                client_id=CLIENT_ID,
+                client_secret=CLIENT_SECRET
+            )
+        
+        # Get token for SQL Server resource
+        access_token = _credential.get_token("https://database.windows.net/.default")
+        
+        # ODBC expects the token as UTF-16-LE bytes prefixed with their length
+        token_bytes = access_token.token.encode("utf-16-le")
+        token_struct = struct.pack("=i", len(token_bytes)) + token_bytes
+        
+        _token_cache = (access_token.expires_on, token_struct)
+        return token_struct
 
 # Set auth level based on environment
-auth_level = func.AuthLevel.ANONYMOUS if not is_azure else func.AuthLevel.FUNCTION
+auth_level = func.AuthLevel.ANONYMOUS if not IS_AZURE else func.AuthLevel.FUNCTION
 
 app = func.FunctionApp(http_auth_level=auth_level)
 
-@app.route(route="ui", methods=["GET"])
-async def serve_ui(req: func.HttpRequest) -> func.HttpResponse:
-    # No authentication check for UI endpoint
-    html_content = """
+# Static UI page, encoded once at import so serve_ui does no per-request work
+_UI_HTML = """
 <!DOCTYPE html>
 <html lang="en">
 <head>
     <meta charset="UTF-8">
     <meta name="viewport" content="width=device-width, initial-scale=1.0">
     <title>Weather Station Configuration</title>
+    <!-- Open the CDN connection early; fonts are fetched in CORS mode, so warm both kinds -->
+    <link rel="preconnect" href="https://cdn.jsdelivr.net">
+    <link rel="preconnect" href="https://cdn.jsdelivr.net" crossorigin>
+    <link rel="preload" as="script" href="https://cdn.jsdelivr.net/npm/bootstrap@5.3.0/dist/js/bootstrap.bundle.min.js">
+    <link rel="preload" as="script" href="https://cdn.jsdelivr.net/npm/toastify-js@1.12.0">
     <link href="https://cdn.jsdelivr.net/npm/bootstrap@5.3.0/dist/css/bootstrap.min.css" rel="stylesheet">
-    <link href="https://cdn.jsdelivr.net/npm/toastify-js/src/toastify.min.css" rel="stylesheet">
-    <link href="https://cdn.jsdelivr.net/npm/@fortawesome/fontawesome-free/css/all.min.css" rel="stylesheet">
+    <link href="https://cdn.jsdelivr.net/npm/toastify-js@1.12.0/src/toastify.min.css" rel="stylesheet">
+    <link href="https://cdn.jsdelivr.net/npm/@fortawesome/fontawesome-free@6.5.2/css/all.min.css" rel="stylesheet">
     <style>
         :root {
             --fabric-primary: #0078D4;
@@ -366,10 +769,37 @@ async def serve_ui(req: func.HttpRequest) -> func.HttpResponse:
         </div>
     </div>
 
-    <script src="https://cdn.jsdelivr.net/npm/bootstrap@5.3.0/dist/js/bootstrap.bundle.min.js"></script>
-    <script src="https://cdn.jsdelivr.net/npm/toastify-js"></script>
+    <!-- Row skeletons cloned by renderStationsTable -->
+    <template id="stationRowTemplate">
+        <tr>
+            <td class="action-buttons">
+                <button class="btn btn-sm btn-outline-primary" data-action="edit" title="Edit">
+                    <i class="fas fa-edit"></i>
+                </button>
+                <button class="btn btn-sm btn-outline-secondary" data-action="clone" title="Clone">
+                    <i class="fas fa-clone"></i>
+                </button>
+                <button class="btn btn-sm btn-outline-danger" data-action="delete" title="Delete">
+                    <i class="fas fa-trash"></i>
+                </button>
+            </td>
+        </tr>
+    </template>
+
+    <template id="checkboxCellTemplate">
+        <td class="text-center">
+            <div class="form-check d-flex justify-content-center">
+                <input class="form-check-input" type="checkbox" disabled>
+            </div>
+        </td>
+    </template>
+
+    <script src="https://cdn.jsdelivr.net/npm/bootstrap@5.3.0/dist/js/bootstrap.bundle.min.js" defer></script>
+    <script src="https://cdn.jsdelivr.net/npm/toastify-js@1.12.0" defer></script>
     <script>
         let schema = [];
+        let tableColumns = [];
+        let formColumns = [];
         let stations = [];
         let currentStation = null;
         let stationModal;
@@ -380,6 +810,7 @@ async def serve_ui(req: func.HttpRequest) -> func.HttpResponse:
             try {
                 // Initialize the modal when the DOM is loaded
                 stationModal = new bootstrap.Modal(document.getElementById('stationModal'));
+                document.getElementById('stationsTableBody').addEventListener('click', handleRowAction);
                 // Initialize the application
                 await initialize();
             } catch (error) {
@@ -411,13 +842,26 @@ async def serve_ui(req: func.HttpRequest) -> func.HttpResponse:
         async function initialize() {
             try {
                 showLoading();
-                const schemaResponse = await fetch(`${baseUrl}/api/schema`);
+                // Schema and stations are independent, so fetch them in parallel
+                const [schemaResponse, stationsResponse] = await Promise.all([
+                    fetch(`${baseUrl}/api/schema`),
+                    fetch(`${baseUrl}/api/stations`)
+                ]);
                 if (!schemaResponse.ok) {
                     throw new Error('Failed to fetch schema');
                 }
-                const schemaData = await schemaResponse.json();
+                if (!stationsResponse.ok) {
+                    throw new Error('Failed to fetch stations');
+                }
+                const [schemaData, stationsData] = await Promise.all([
+                    schemaResponse.json(),
+                    stationsResponse.json()
+                ]);
                 schema = schemaData.columns;
-                await loadStations();
+                stations = unpackStations(stationsData);
+                cacheColumns();
+                renderStationsHeader();
+                renderStationsTable();
             } catch (error) {
                 console.error('Initialization error:', error);
                 throw error;
@@ -429,8 +873,11 @@ async def serve_ui(req: func.HttpRequest) -> func.HttpResponse:
         async function loadStations() {
             try {
                 const response = await fetch(`${baseUrl}/api/stations`);
+                if (!response.ok) {
+                    throw new Error('Failed to fetch stations');
+                }
                 const data = await response.json();
-                stations = data.stations;
+                stations = unpackStations(data);
                 renderStationsTable();
             } catch (error) {
                 console.error('Error loading stations:', error);
@@ -438,6 +885,24 @@ async def serve_ui(req: func.HttpRequest) -> func.HttpResponse:
             }
         }
 
+        async function handleMissingStation() {
+            // Another user removed the station, so the local list is stale
+            showToast('Station no longer exists', 'error');
+            await loadStations();
+        }
+
+        function unpackStations(data) {
+            // The list arrives as one column list plus value arrays; rebuild row objects here
+            const { columns, rows } = data;
+            return rows.map(row => {
+                const station = {};
+                for (let i = 0; i < columns.length; i++) {
+                    station[columns[i]] = row[i];
+                }
+                return station;
+            });
+        }
+
         function formatLabel(columnName) {
             // Special cases
             if (columnName === 'URL') return 'URL';
@@ -452,6 +917,16 @@ async def serve_ui(req: func.HttpRequest) -> func.HttpResponse:
                 .trim(); // Remove any leading/trailing spaces
         }
 
+        // Case-insensitive, numeric-aware string ordering
+        const sortCollator = new Intl.Collator(undefined, { numeric: true, sensitivity: 'base' });
+
+        function compareSortKeys(a, b) {
+            if (typeof a === 'string' && typeof b === 'string') return sortCollator.compare(a, b);
+            if (a < b) return -1;
+            if (a > b) return 1;
+            return 0;
+        }
+
         function sortStations(column) {
             if (currentSort.column === column) {
                 // If clicking the same column, reverse the sort direction
@@ -462,94 +937,103 @@ async def serve_ui(req: func.HttpRequest) -> func.HttpResponse:
                 currentSort.ascending = true;
             }
 
-            stations.sort((a, b) => {
-                let valueA = a[column];
-                let valueB = b[column];
+            // Extract each row's sort key once; null values always sort last
+            const keyed = [];
+            const missing = [];
+            for (const station of stations) {
+                const value = station[column];
+                if (value === null || value === undefined) {
+                    missing.push(station);
+                } else {
+                    keyed.push([value, station]);
+                }
+            }
 
-                // Handle null values
-                if (valueA === null || valueA === undefined) return 1;
-                if (valueB === null || valueB === undefined) return -1;
+            const direction = currentSort.ascending ? 1 : -1;
+            keyed.sort((a, b) => direction * compareSortKeys(a[0], b[0]));
+            stations = keyed.map(entry => entry[1]).concat(missing);
 
-                // Convert to lowercase for string comparison
-                if (typeof valueA === 'string') valueA = valueA.toLowerCase();
-                if (typeof valueB === 'string') valueB = valueB.toLowerCase();
+            renderStationsTable();
+        }
 
-                if (valueA < valueB) return currentSort.ascending ? -1 : 1;
-                if (valueA > valueB) return currentSort.ascending ? 1 : -1;
-                return 0;
-            });
+        function isVisibleColumn(col) {
+            return !col.name.includes('ConnectionString') &&
+                   col.name !== 'ID' &&
+                   col.name !== 'TempestToken';
+        }
 
-            renderStationsTable();
+        function cacheColumns() {
+            // Column lists and labels only change when the schema does
+            tableColumns = schema
+                .filter(isVisibleColumn)
+                .map(col => ({ ...col, label: col.name === 'IsActive' ? 'Active' : formatLabel(col.name) }));
+            formColumns = schema
+                .filter(col => col.name !== 'ID')
+                .map(col => ({ ...col, label: formatLabel(col.name) }));
+        }
+
+        function renderStationsHeader() {
+            // Built once per schema load; sorting only toggles classes
+            const frag = document.createDocumentFragment();
+            for (const col of tableColumns) {
+                const th = document.createElement('th');
+                th.className = 'sortable';
+                th.dataset.column = col.name;
+                th.append(col.label);
+                const icon = document.createElement('span');
+                icon.className = 'sort-icon';
+                th.append(icon);
+                th.addEventListener('click', () => sortStations(col.name));
+                frag.append(th);
+            }
+            const actionsHeader = document.createElement('th');
+            actionsHeader.textContent = 'Actions';
+            frag.append(actionsHeader);
+            document.getElementById('stationsTableHeader').replaceChildren(frag);
+        }
+
+        function updateSortIndicators() {
+            for (const th of document.querySelectorAll('#stationsTableHeader th.sortable')) {
+                const isSortColumn = th.dataset.column === currentSort.column;
+                th.classList.toggle('sort-asc', isSortColumn && currentSort.ascending);
+                th.classList.toggle('sort-desc', isSortColumn && !currentSort.ascending);
+            }
         }
 
         function renderStationsTable() {
-            // Render headers first
-            const thead = document.getElementById('stationsTableHeader');
-            const columnHeaders = schema
-                .filter(col => !col.name.includes('ConnectionString') && 
-                             col.name !== 'ID' && 
-                             col.name !== 'TempestToken')
-                .map(col => {
-                    const isSortColumn = currentSort.column === col.name;
-                    const sortClass = isSortColumn 
-                        ? (currentSort.ascending ? 'sort-asc' : 'sort-desc')
-                        : '';
-                    
-                    if (col.name === 'IsActive') {
-                        return `
-                            <th class="sortable ${sortClass}" onclick="sortStations('${col.name}')">
-                                Active
-                                <span class="sort-icon"></span>
-                            </th>`;
+            updateSortIndicators();
+
+            // Clone row skeletons from templates and attach them in a single DOM update
+            const rowTemplate = document.getElementById('stationRowTemplate').content.firstElementChild;
+            const checkboxTemplate = document.getElementById('checkboxCellTemplate').content.firstElementChild;
+            const frag = document.createDocumentFragment();
+            for (const station of stations) {
+                const tr = rowTemplate.cloneNode(true);
+                tr.dataset.id = station.ID;
+                const actionsCell = tr.lastElementChild;
+                for (const col of tableColumns) {
+                    let td;
+                    if (col.type === 'bit' || col.name === 'IsActive') {
+                        td = checkboxTemplate.cloneNode(true);
+                        td.querySelector('input').checked = !!station.IsActive;
+                    } else {
+                        td = document.createElement('td');
+                        td.textContent = station[col.name] || '';
                     }
-                    return `
-                        <th class="sortable ${sortClass}" onclick="sortStations('${col.name}')">
-                            ${formatLabel(col.name)}
-                            <span class="sort-icon"></span>
-                        </th>`;
-                })
-                .join('');
-            thead.innerHTML = columnHeaders + '<th>Actions</th>';
-
-            // Render table body
-            const tbody = document.getElementById('stationsTableBody');
-            tbody.innerHTML = stations.map(station => {
-                const cells = schema
-                    .filter(col => !col.name.includes('ConnectionString') && 
-                                 col.name !== 'ID' && 
-                                 col.name !== 'TempestToken')
-                    .map(col => {
-                        if (col.type === 'bit' || col.name === 'IsActive') {
-                            return `
-                                <td class="text-center">
-                                    <div class="form-check d-flex justify-content-center">
-                                        <input class="form-check-input" 
-                                               type="checkbox" 
-                                               ${station.IsActive ? 'checked' : ''} 
-                                               disabled>
-                                    </div>
-                                </td>`;
-                        }
-                        return `<td>${station[col.name] || ''}</td>`;
-                    })
-                    .join('');
-
-                return `
-                    <tr>
-                        ${cells}
-                        <td class="action-buttons">
-                            <button class="btn btn-sm btn-outline-primary" onclick="editStation(${station.ID})" title="Edit">
-                                <i class="fas fa-edit"></i>
-                            </button>
-                            <button class="btn btn-sm btn-outline-secondary" onclick="cloneStation(${station.ID})" title="Clone">
-                                <i class="fas fa-clone"></i>
-                            </button>
-                            <button class="btn btn-sm btn-outline-danger" onclick="deleteStation(${station.ID})" title="Delete">
-                                <i class="fas fa-trash"></i>
-                            </button>
-                        </td>
-                    </tr>`;
-            }).join('');
+                    tr.insertBefore(td, actionsCell);
+                }
+                frag.appendChild(tr);
+            }
+            document.getElementById('stationsTableBody').replaceChildren(frag);
+        }
+
+        function handleRowAction(event) {
+            const button = event.target.closest('button[data-action]');
+            if (!button) return;
+            const id = Number(button.closest('tr').dataset.id);
+            if (button.dataset.action === 'edit') editStation(id);
+            else if (button.dataset.action === 'clone') cloneStation(id);
+            else if (button.dataset.action === 'delete') deleteStation(id);
         }
 
         function showAddStationModal() {
@@ -559,17 +1043,34 @@ async def serve_ui(req: func.HttpRequest) -> func.HttpResponse:
             stationModal.show();
         }
 
-        function editStation(id) {
-            currentStation = stations.find(s => s.ID === id);
-            document.getElementById('modalTitle').textContent = 'Edit Station';
-            renderForm(currentStation);
-            stationModal.show();
+        async function editStation(id) {
+            try {
+                showLoading();
+                // The list omits secret columns, so fetch the full row for the form
+                const response = await fetch(`${baseUrl}/api/stations/${id}`);
+                if (response.status === 404) {
+                    await handleMissingStation();
+                    return;
+                }
+                if (!response.ok) {
+                    throw new Error('Failed to load station');
+                }
+
+                currentStation = (await response.json()).station;
+                document.getElementById('modalTitle').textContent = 'Edit Station';
+                renderForm(currentStation);
+                stationModal.show();
+            } catch (error) {
+                console.error('Error loading station:', error);
+                showToast('Failed to load station', 'error');
+            } finally {
+                hideLoading();
+            }
         }
 
         function renderForm(data) {
             const form = document.getElementById('stationForm');
-            form.innerHTML = schema
-                .filter(col => col.name !== 'ID')
+            form.innerHTML = formColumns
                 .map(col => {
                     // Handle boolean type (isActive)
                     if (col.type === 'bit' || col.name === 'IsActive') {
@@ -604,7 +1105,7 @@ async def serve_ui(req: func.HttpRequest) -> func.HttpResponse:
                     // Default text input for other fields
                     return `
                         <div class="mb-3">
-                            <label class="form-label">${formatLabel(col.name)}</label>
+                            <label class="form-label">${col.label}</label>
                             <input type="text" 
                                    class="form-control" 
                                    name="${col.name}" 
@@ -639,12 +1140,24 @@ async def serve_ui(req: func.HttpRequest) -> func.HttpResponse:
                     body: JSON.stringify(data)
                 });
 
-                if (response.ok) {
+                if (response.status === 404) {
+                    stationModal.hide();
+                    await handleMissingStation();
+                } else if (response.ok) {
                     // First hide the modal
                     stationModal.hide();
                     
-                    // Then reload the data
-                    await loadStations();
+                    // Then apply the returned row locally instead of reloading the table
+                    const body = await response.json();
+                    const index = currentStation
+                        ? stations.findIndex(s => s.ID === currentStation.ID)
+                        : -1;
+                    if (index === -1) {
+                        stations.push(body.station);
+                    } else {
+                        stations[index] = body.station;
+                    }
+                    renderStationsTable();
                     
                     // Finally show the success message
                     showToast(`Station ${currentStation ? 'updated' : 'created'} successfully`);
@@ -665,12 +1178,16 @@ async def serve_ui(req: func.HttpRequest) -> func.HttpResponse:
 
             try {
                 showLoading();
-                const response = await fetch(`${baseUrl}/api/stations/clone/${id}`, {
+                const response = await fetch(`${baseUrl}/api/stations/clone/${id}?full=1`, {
                     method: 'POST'
                 });
 
-                if (response.ok) {
-                    await loadStations();
+                if (response.status === 404) {
+                    await handleMissingStation();
+                } else if (response.ok) {
+                    const body = await response.json();
+                    stations.push(body.station);
+                    renderStationsTable();
                     showToast('Station cloned successfully');
                 } else {
                     throw new Error('Failed to clone station');
@@ -692,8 +1209,11 @@ async def serve_ui(req: func.HttpRequest) -> func.HttpResponse:
                     method: 'DELETE'
                 });
 
-                if (response.ok) {
-                    await loadStations();
+                if (response.status === 404) {
+                    await handleMissingStation();
+                } else if (response.ok) {
+                    stations = stations.filter(s => s.ID !== id);
+                    renderStationsTable();
                     showToast('Station deleted successfully');
                 } else {
                     throw new Error('Failed to delete station');
@@ -708,158 +1228,362 @@ async def serve_ui(req: func.HttpRequest) -> func.HttpResponse:
     </script>
 </body>
 </html>
-    """
-    
+""".encode("utf-8")
+_UI_HTML_GZIP = gzip.compress(_UI_HTML, compresslevel=9)
+# Short max-age since the page isn't versioned; after that the ETag turns a reload into a 304
+_UI_ETAG = hashlib.blake2b(_UI_HTML, digest_size=16).hexdigest()
+_UI_HEADERS = {
+    "Cache-Control": "public, max-age=300",
+    "Vary": "Accept-Encoding",
+    "ETag": f'"{_UI_ETAG}"'
+}
+_UI_GZIP_HEADERS = {**_UI_HEADERS, "Content-Encoding": "gzip", "ETag": f'"{_UI_ETAG}-gz"'}
+
+@app.route(route="ui", methods=["GET"])
+async def serve_ui(req: func.HttpRequest) -> func.HttpResponse:
+    # No authentication check for UI endpoint
+    if 'gzip' in req.headers.get('Accept-Encoding', ''):
+        body, headers = _UI_HTML_GZIP, _UI_GZIP_HEADERS
+    else:
+        body, headers = _UI_HTML, _UI_HEADERS
+    if headers["ETag"] in req.headers.get('If-None-Match', ''):
+        return func.HttpResponse(status_code=304, headers=headers)
     return func.HttpResponse(
-        html_content,
+        body,
         mimetype="text/html",
-        status_code=200
+        status_code=200,
+        headers=headers
     )
 
 @app.route(route="schema")
 @require_auth
 async def get_schema(req: func.HttpRequest) -> func.HttpResponse:
     try:
-        schema = get_cached_schema()
-        return format_response({"columns": schema})
+        # Warm cache is served inline; only a cold or expired cache needs the DB thread
+        cached = peek_cached_schema_response()
+        if cached is None:
+            cached = await run_db(get_cached_schema_response, retry=True)
+        body, etag = cached
+        return conditional_json_response(req, body, etag, _SCHEMA_CACHE_CONTROL)
     except Exception as e:
-        logging.error(f"Error getting schema: {str(e)}")
-        return format_response({"error": str(e)}, 500)
+        logging.error("Error getting schema: %s", e, exc_info=True)
+        return error_response(e, 500)
+
+def _fetch_stations_sync():
+    """Select all stations and return the encoded response body"""
+    sql, columns = get_list_sql()
+    with borrow_cursor() as cursor:
+        cursor.arraysize = _FETCH_BATCH_SIZE
+        
+        execute_schema_sql(cursor, sql)
+        
+        # Rows go out as value arrays under one column list, so no per-row dicts or repeated keys;
+        # encode each batch as it arrives and splice the JSON arrays together
+        chunks = []
+        while rows := cursor.fetchmany():
+            chunks.append(orjson.dumps([tuple(row) for row in rows], default=str)[1:-1])
+    
+    return b'{"columns":' + orjson.dumps(columns) + b',"rows":[' + b','.join(chunks) + b']}'
 
 @app.route(route="stations", methods=["GET"], auth_level=auth_level)
 @require_auth
 async def get_stations(req: func.HttpRequest) -> func.HttpResponse:
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
+        cached = get_cached_result(_list_sql)
+        if cached is None:
+            generation = _result_cache_generation
+            body = await run_db(_fetch_stations_sync, retry=True)
+            cached = store_cached_result(_list_sql, body, generation)
+        body, etag = cached
+        return conditional_json_response(req, body, etag)
+    except Exception as e:
+        logging.error("Error getting stations: %s", e, exc_info=True)
+        return error_response(e, 500)
+
+def _get_station_sync(station_id):
+    """Select one station with every column, including those the list leaves out; None if missing"""
+    sql, station_columns = get_station_sql()
+    with borrow_cursor() as cursor:
+        cursor.setinputsizes(_ID_INPUT_SIZES)
         
-        cursor.execute("SELECT * FROM StationTracking")
-        columns = [column[0] for column in cursor.description]
+        execute_schema_sql(cursor, sql, station_id)
+        row = cursor.fetchone()
         
-        stations = []
-        for row in cursor.fetchall():
-            station = dict(zip(columns, row))
-            stations.append(station)
+        if row is None:
+            return None
         
-        return format_response({"stations": stations})
+        return row_to_dict(cursor, row, station_columns)
+
+@app.route(route="stations/{id}", methods=["GET"], auth_level=auth_level)
+@require_auth
+async def get_station(req: func.HttpRequest) -> func.HttpResponse:
+    try:
+        station_id = parse_station_id(req)
+        
+        station = await run_db(_get_station_sync, station_id, retry=True)
+        if station is None:
+            return not_found_response(station_id)
+        return format_response({"station": station})
+    except ValueError as e:
+        logging.warning("Invalid get station request: %s", e)
+        return error_response(e, 400)
     except Exception as e:
-        logging.error(f"Error getting stations: {str(e)}")
-        return format_response({"error": str(e)}, 500)
+        logging.error("Error getting station: %s", e, exc_info=True)
+        return error_response(e, 500)
+
+_MAX_BULK_STATIONS = 1000
+# SQL Server allows 2100 parameters per call, and sp_prepexec's own arguments count toward it
+_MAX_SQL_PARAMS = 2097
+_MAX_VALUES_ROWS = 1000  # SQL Server's limit on rows in one VALUES list
+
+def batch_sizes(total, cap):
+    """Split total rows into full batches of cap, then power-of-two batches for the rest"""
+    # Few distinct sizes means few distinct SQL texts, and so few server plans, per column set
+    rest = total % cap
+    return [cap] * (total // cap) + [1 << bit for bit in reversed(range(rest.bit_length())) if rest >> bit & 1]
+
+def station_body(req_body):
+    """Check a write request body is a non-empty JSON object and drop any client-supplied ID"""
+    if not req_body:
+        raise ValueError("Request body is empty")
+    if not isinstance(req_body, dict):
+        raise ValueError("Station must be a JSON object")
+
+    if 'ID' in req_body:
+        del req_body['ID']
+    return req_body
+
+def new_station_values(req_body):
+    """Keep the writable columns of a create body, then default IsActive on"""
+    # Filter first so a body with no real columns is rejected rather than saved as a blank station
+    values = writable_values(req_body)
+    if 'IsActive' in values:
+        values['IsActive'] = bool(values['IsActive'])
+    else:
+        values['IsActive'] = True
+    return values
+
+def _create_station_sync(req_body):
+    """Insert a station and return the created row"""
+    req_body = new_station_values(req_body)
+    columns = ordered_columns(req_body)
+    sql = get_insert_sql(columns)
+    station_columns = get_station_columns()
+    with borrow_cursor() as cursor:
+        cursor.execute(sql, [req_body[k] for k in columns])
+        row = cursor.fetchone()
+        
+        if not row:
+            raise Exception("Failed to retrieve newly created station")
+
+        return row_to_dict(cursor, row, station_columns)
 
 @app.route(route="stations", methods=["POST"], auth_level=auth_level)
 @require_auth
 async def create_station(req: func.HttpRequest) -> func.HttpResponse:
     try:
-        req_body = req.get_json()
-        if not req_body:
-            raise ValueError("Request body is empty")
-
-        if 'ID' in req_body:
-            del req_body['ID']
-
-        if 'IsActive' in req_body:
-            req_body['IsActive'] = bool(req_body['IsActive'])
-        else:
-            req_body['IsActive'] = True
-
-        conn = get_db_connection()
-        cursor = conn.cursor()
-
-        try:
-            columns = ', '.join(req_body.keys())
-            values = ', '.join(['?' for _ in req_body])
-            sql = f"INSERT INTO StationTracking ({columns}) OUTPUT INSERTED.* VALUES ({values})"
-
-            cursor.execute(sql, list(req_body.values()))
-            row = cursor.fetchone()
-            
-            if not row:
-                raise Exception("Failed to retrieve newly created station")
-
-            columns = [column[0] for column in cursor.description]
-            new_station = dict(zip(columns, row))
-
-            conn.commit()
-            return format_response({"station": new_station}, 201)
-        finally:
-            cursor.close()
+        req_body = station_body(req.get_json())
 
+        new_station = await run_db(_create_station_sync, req_body)
+        invalidate_result_cache()
+        return format_response({"station": new_station}, 201)
+    except ValueError as e:
+        logging.warning("Invalid create station request: %s", e)
+        return error_response(e, 400)
     except Exception as e:
-        logging.error(f"Error creating station: {str(e)}")
-        return format_response({"error": str(e)}, 500)
-
-@app.route(route="stations/{id}", methods=["PUT"], auth_level=auth_level)
+        logging.error("Error creating station: %s", e, exc_info=True)
+        return error_response(e, 500)
+
+def _create_stations_bulk_sync(bodies):
+    """Insert many stations in one transaction and return the created rows, grouped by column set"""
+    # Group rows by column set; each group goes in as multi-row INSERTs of fixed batch sizes.
+    # The rows come back grouped that way, not in request order.
+    groups = {}
+    for body in bodies:
+        values = new_station_values(body)
+        columns = ordered_columns(values)
+        groups.setdefault(columns, []).append([values[k] for k in columns])
+    station_columns = get_station_columns()
+
+    created = []
+    with borrow_cursor() as cursor, transaction(cursor.connection):
+        for columns, rows in groups.items():
+            cap = min(_MAX_VALUES_ROWS, _MAX_SQL_PARAMS // len(columns))
+            start = 0
+            for size in batch_sizes(len(rows), cap):
+                batch = rows[start:start + size]
+                start += size
+                cursor.execute(
+                    get_insert_sql(columns, len(batch)),
+                    [value for row in batch for value in row]
+                )
+                created.extend(row_to_dict(cursor, row, station_columns) for row in cursor.fetchall())
+    return created
+
+@app.route(route="stations/bulk", methods=["POST"], auth_level=auth_level)
 @require_auth
-async def update_station(req: func.HttpRequest) -> func.HttpResponse:
+async def create_stations_bulk(req: func.HttpRequest) -> func.HttpResponse:
     try:
-        station_id = req.route_params.get('id')
         req_body = req.get_json()
+        bodies = req_body.get('stations') if isinstance(req_body, dict) else None
+        if not isinstance(bodies, list) or not bodies:
+            raise ValueError("Request body must contain a non-empty 'stations' list")
+        if len(bodies) > _MAX_BULK_STATIONS:
+            raise ValueError(f"At most {_MAX_BULK_STATIONS} stations can be created at once")
+
+        bodies = [station_body(body) for body in bodies]
+
+        new_stations = await run_db(_create_stations_bulk_sync, bodies)
+        invalidate_result_cache()
+        return format_response({"stations": new_stations}, 201)
+    except ValueError as e:
+        logging.warning("Invalid bulk create stations request: %s", e)
+        return error_response(e, 400)
+    except Exception as e:
+        logging.error("Error creating stations: %s", e, exc_info=True)
+        return error_response(e, 500)
+
+def _update_station_sync(station_id, req_body):
+    """Update a station and return the updated row, or None if it doesn't exist"""
+    req_body = writable_values(req_body)
+    columns = ordered_columns(req_body)
+    sql = get_update_sql(columns)
+    station_columns = get_station_columns()
+    with borrow_cursor() as cursor:
         
-        if 'ID' in req_body:
-            del req_body['ID']
-        
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        set_clause = ', '.join([f"{k} = ?" for k in req_body.keys()])
-        sql = f"UPDATE StationTracking SET {set_clause} WHERE ID = ?"
-        
-        params = list(req_body.values()) + [station_id]
+        params = [req_body[k] for k in columns]
+        params.append(station_id)
         cursor.execute(sql, params)
-        conn.commit()
+        row = cursor.fetchone()
         
-        cursor.execute("SELECT * FROM StationTracking WHERE ID = ?", station_id)
-        columns = [column[0] for column in cursor.description]
-        updated_station = dict(zip(columns, cursor.fetchone()))
+        if row is None:
+            return None
         
+        return row_to_dict(cursor, row, station_columns)
+
+@app.route(route="stations/{id}", methods=["PUT"], auth_level=auth_level)
+@require_auth
+async def update_station(req: func.HttpRequest) -> func.HttpResponse:
+    try:
+        station_id = parse_station_id(req)
+        req_body = station_body(req.get_json())
+        
+        updated_station = await run_db(_update_station_sync, station_id, req_body)
+        if updated_station is None:
+            return not_found_response(station_id)
+        invalidate_result_cache()
         return format_response({"station": updated_station})
+    except ValueError as e:
+        logging.warning("Invalid update station request: %s", e)
+        return error_response(e, 400)
     except Exception as e:
-        logging.error(f"Error updating station: {str(e)}")
-        return format_response({"error": str(e)}, 500)
+        logging.error("Error updating station: %s", e, exc_info=True)
+        return error_response(e, 500)
+
+def _delete_station_sync(station_id):
+    """Delete a station by ID and return the number of rows removed"""
+    with borrow_cursor() as cursor:
+        cursor.setinputsizes(_ID_INPUT_SIZES)
+        
+        cursor.execute("DELETE FROM StationTracking WHERE ID = ?", station_id)
+        return cursor.rowcount
 
 @app.route(route="stations/{id}", methods=["DELETE"], auth_level=auth_level)
 @require_auth
 async def delete_station(req: func.HttpRequest) -> func.HttpResponse:
     try:
-        station_id = req.route_params.get('id')
-        
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute("DELETE FROM StationTracking WHERE ID = ?", station_id)
-        conn.commit()
+        station_id = parse_station_id(req)
         
+        if not await run_db(_delete_station_sync, station_id):
+            return not_found_response(station_id)
+        invalidate_result_cache()
         return func.HttpResponse(status_code=204)
+    except ValueError as e:
+        logging.warning("Invalid delete station request: %s", e)
+        return error_response(e, 400)
     except Exception as e:
-        logging.error(f"Error deleting station: {str(e)}")
-        return format_response({"error": str(e)}, 500)
+        logging.error("Error deleting station: %s", e, exc_info=True)
+        return error_response(e, 500)
+
+def _clone_station_sync(station_id, full):
+    """Copy a station to a new row and return it, or just its ID unless full; None if missing"""
+    sql, columns = get_clone_sql(full)
+    with borrow_cursor() as cursor:
+        cursor.setinputsizes(_ID_INPUT_SIZES)
+        
+        # Copy and return the new row in one round trip
+        execute_schema_sql(cursor, sql, station_id)
+        row = cursor.fetchone()
+        
+        if row is None:
+            return None
+        
+        return row_to_dict(cursor, row, columns)
 
 @app.route(route="stations/clone/{id}", methods=["POST"], auth_level=auth_level)
 @require_auth
 async def clone_station(req: func.HttpRequest) -> func.HttpResponse:
     try:
-        station_id = req.route_params.get('id')
-        
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute("SELECT * FROM StationTracking WHERE ID = ?", station_id)
-        columns = [column[0] for column in cursor.description]
-        source_station = dict(zip(columns, cursor.fetchone()))
+        station_id = parse_station_id(req)
         
-        del source_station['ID']
-        
-        columns = ', '.join(source_station.keys())
-        values = ', '.join(['?' for _ in source_station])
-        sql = f"INSERT INTO StationTracking ({columns}) VALUES ({values})"
-        
-        cursor.execute(sql, list(source_station.values()))
-        conn.commit()
-        
-        cursor.execute("SELECT * FROM StationTracking WHERE ID = SCOPE_IDENTITY()")
-        new_station = dict(zip(columns.split(','), cursor.fetchone()))
+        # Only serialize the new row when the caller asks for it
+        full = req.params.get('full') == '1'
+        new_station = await run_db(_clone_station_sync, station_id, full)
+        if new_station is None:
+            return not_found_response(station_id)
+        invalidate_result_cache()
+        if full:
+            return format_response({"station": new_station}, 201)
+        return func.HttpResponse(
+            status_code=201,
+            headers={"Location": f"/api/stations/{new_station['ID']}"}
+        )
+    except ValueError as e:
+        logging.warning("Invalid clone station request: %s", e)
+        return error_response(e, 400)
+    except Exception as e:
+        logging.error("Error cloning station: %s", e, exc_info=True)
+        return error_response(e, 500)
+
+def _clone_stations_sync(station_ids):
+    """Copy many stations with one INSERT ... SELECT and return the new rows"""
+    # Pad the IN list to a power of two by repeating an ID, which IN ignores, so only a
+    # handful of SQL texts and plans exist; at most 1024 IDs stays under the parameter limit
+    count = 1 << (len(station_ids) - 1).bit_length()
+    params = station_ids + station_ids[-1:] * (count - len(station_ids))
+    sql, columns = get_clone_many_sql(count)
+    with borrow_cursor() as cursor:
+        cursor.setinputsizes(_ID_INPUT_SIZES * count)
         
-        return format_response({"station": new_station}, 201)
+        execute_schema_sql(cursor, sql, params)
+        return [row_to_dict(cursor, row, columns) for row in cursor.fetchall()]
+
+@app.route(route="stations/clone", methods=["POST"], auth_level=auth_level)
+@require_auth
+async def clone_stations(req: func.HttpRequest) -> func.HttpResponse:
+    try:
+        req_body = req.get_json()
+        ids = req_body.get('ids') if isinstance(req_body, dict) else None
+        if not isinstance(ids, list) or not ids:
+            raise ValueError("Request body must contain a non-empty 'ids' list")
+        if len(ids) > _MAX_BULK_STATIONS:
+            raise ValueError(f"At most {_MAX_BULK_STATIONS} stations can be cloned at once")
+        if not all(is_station_id(station_id) for station_id in ids):
+            raise ValueError("Station IDs must be integers in the INT range")
+
+        # IN matches each source row once, so duplicates would only inflate the parameter list
+        station_ids = list(dict.fromkeys(ids))
+
+        new_stations = await run_db(_clone_stations_sync, station_ids)
+        invalidate_result_cache()
+        return format_response({"stations": new_stations}, 201)
+    except ValueError as e:
+        logging.warning("Invalid bulk clone stations request: %s", e)
+        return error_response(e, 400)
     except Exception as e:
-        logging.error(f"Error cloning station: {str(e)}")
-        return format_response({"error": str(e)}, 500)
\ No newline at end of file
+        logging.error("Error cloning stations: %s", e, exc_info=True)
+        return error_response(e, 500)
+
+# Warm the schema cache at startup and keep it fresh off the request path
+if SQL_SERVER:
+    threading.Thread(target=_refresh_schema_loop, name="schema-refresh", daemon=True).start()